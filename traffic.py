@@ -1,18 +1,46 @@
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, time as dtime
 
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
+import numpy as np
+import orjson
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
 from dateutil import tz
 
+# Serialize figures for st.plotly_chart with orjson rather than stdlib json
+pio.json.config.default_engine = "orjson"
+
 # ---------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------
 
 DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_TO_INDEX = {day: i for i, day in enumerate(DAYS_ORDER)}
+
+# Default number of Distance Matrix requests kept in flight at once, and the
+# hard cap (also the HTTP connection pool size)
+MAX_CONCURRENT_REQUESTS = 10
+HTTP_POOL_MAXSIZE = 16
+
+# Distance Matrix per-request limits
+MAX_ORIGINS_PER_REQUEST = 25
+MAX_DESTINATIONS_PER_REQUEST = 25
+MAX_ELEMENTS_PER_REQUEST = 100
+
+# Departure times are rounded down to this many seconds for caching
+DEPARTURE_BUCKET_SECONDS = 15 * 60
+
+# Progress widgets are refreshed at most this many times per heatmap build,
+# plus whenever this much time has passed since the last refresh
+PROGRESS_UPDATE_STEPS = 50
+PROGRESS_UPDATE_INTERVAL_SECONDS = 0.25
 
 def format_hour_12h(hour: int) -> str:
     """Convert 24-hour format to 12-hour format with AM/PM."""
@@ -25,68 +53,185 @@ def format_hour_12h(hour: int) -> str:
     else:
         return f"{hour - 12} PM"
 
-def get_next_datetime_for_weekday(target_weekday_index: int, hour: int, minute: int, tzinfo):
+# 12-hour labels for each hour of the day, and the reverse lookup
+HOUR_LABELS = [format_hour_12h(h) for h in range(24)]
+HOUR_FROM_LABEL = {label: h for h, label in enumerate(HOUR_LABELS)}
+
+@st.cache_data(show_spinner=False)
+def build_time_slots(start_hour: int, end_hour: int, step_minutes: int):
+    """
+    Build (label, (hour, minute)) time slots from start_hour to end_hour
+    inclusive, every step_minutes, with 12-hour labels like "7:30 AM".
+    Cached per (start_hour, end_hour, step_minutes) across reruns.
+    """
+    minutes = np.arange(start_hour * 60, end_hour * 60 + 1, step_minutes)
+    hours, mins = np.divmod(minutes, 60)
+    display_hours = np.where(hours % 12 == 0, 12, hours % 12)
+    periods = np.where(hours < 12, "AM", "PM")
+    return [
+        (f"{display_hour}:{minute:02d} {period}", (hour, minute))
+        for display_hour, minute, period, hour in zip(
+            display_hours.tolist(), mins.tolist(), periods.tolist(), hours.tolist()
+        )
+    ]
+
+@st.cache_resource
+def get_tzinfo(tz_name: str):
+    """
+    Return the tzinfo for an IANA timezone name (None if unknown).
+    Zones pandas can't localize (e.g. POSIX TZ strings, which dateutil parses
+    into a tzstr) are treated as unknown, since get_departure_epochs needs them.
+    Cached for the life of the server so reruns skip the zoneinfo lookup.
+    """
+    tzinfo = tz.gettz(tz_name)
+    if tzinfo is None:
+        return None
+    try:
+        pd.DatetimeIndex([np.datetime64("2000-01-01")]).tz_localize(tzinfo)
+    except Exception:
+        return None
+    return tzinfo
+
+
+def get_week_anchor(tzinfo):
     """
-    Return the next datetime (in the future) for the given weekday index (0=Monday)
-    at the specified hour/minute, in the given timezone.
+    Return Monday 00:00 of the next week in the given timezone.
+    It is always in the future and only changes once a week.
     """
     now = datetime.now(tzinfo)
-    today_idx = now.weekday()  # 0 = Monday
-    days_ahead = (target_weekday_index - today_idx) % 7
-    candidate_date = (now + timedelta(days=days_ahead)).date()
+    days_ahead = 7 - now.weekday()  # 0 = Monday, so 1..7 days ahead
+    anchor_date = (now + timedelta(days=days_ahead)).date()
+    return datetime.combine(anchor_date, dtime(hour=0, minute=0), tzinfo=tzinfo)
 
-    candidate_dt = datetime.combine(candidate_date, dtime(hour=hour, minute=minute))
 
-    # Attach timezone using dateutil-style tzinfo
-    if tzinfo is not None and candidate_dt.tzinfo is None:
-        candidate_dt = candidate_dt.replace(tzinfo=tzinfo)
+def get_departure_epochs(week_start, day_indices: list, slot_minutes: list, tzinfo):
+    """
+    Return a (days x slots) int64 array of departure times in epoch seconds,
+    for each weekday index (0=Monday) and minute-of-day, in the week starting
+    at week_start (a date, see get_week_anchor()) in the given timezone.
+    """
+    week_start_local = np.datetime64(week_start, "D")
+    days = np.asarray(day_indices, dtype="timedelta64[D]")
+    minutes = np.asarray(slot_minutes, dtype="timedelta64[m]")
+    wall_times = week_start_local + days[:, None] + minutes[None, :]
+
+    # Localize the wall-clock times in one pass (DST-aware). Like attaching a
+    # dateutil tzinfo, ambiguous times resolve to the first (daylight)
+    # occurrence. Times skipped by a DST move come back as NaT
+    flat_wall_times = wall_times.ravel()
+    local = pd.DatetimeIndex(flat_wall_times).tz_localize(
+        tzinfo,
+        ambiguous=np.ones(flat_wall_times.size, dtype=bool),
+        nonexistent="NaT",
+    )
+    skipped = np.asarray(local.isna())
+    epochs = np.empty(flat_wall_times.size, dtype=np.int64)
+    epochs[~skipped] = (local[~skipped] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
 
-    # Ensure it's in the future
-    if candidate_dt <= now:
-        candidate_dt = candidate_dt + timedelta(days=7)
+    # Resolve the few skipped times through dateutil itself, so gaps of any
+    # length (e.g. Lord Howe's 30 minutes) shift exactly as the tzinfo does
+    for i in np.flatnonzero(skipped):
+        wall_time = flat_wall_times[i].astype("datetime64[s]").item()
+        epochs[i] = int(wall_time.replace(tzinfo=tzinfo).timestamp())
+    return epochs.reshape(wall_times.shape)
 
-    return candidate_dt
 
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """
+    Return a shared HTTP session for Distance Matrix calls.
+    Cached for the life of the server so keep-alive connections to
+    maps.googleapis.com are reused across calls and reruns.
+    """
+    session = requests.Session()
+    # pool_block caps open connections at the pool size instead of opening
+    # (and discarding) extra ones when every pooled connection is busy
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=True)
+    session.mount("https://", adapter)
+    return session
 
-def get_places_autocomplete(api_key: str, input_text: str):
+
+@st.cache_resource
+def get_places_session() -> requests.Session:
     """
-    Get autocomplete suggestions from Google Places API.
-    Returns a list of place descriptions, or empty list on failure.
+    Return a separate HTTP session for Places autocomplete.
+    Its pool never blocks, so suggestions can't queue behind a heatmap build
+    that holds every connection of the blocking Distance Matrix pool.
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    return session
+
+
+@st.cache_data(ttl=600, max_entries=512, show_spinner=False)
+def _fetch_places_predictions(api_key: str, query: str):
+    """
+    Fetch autocomplete predictions for an already-normalized query.
+    Raises on HTTP or API errors so that failures are never cached.
     """
-    if not input_text or len(input_text) < 2:
-        return []
-    
     endpoint = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
     
     params = {
-        "input": input_text,
+        "input": query,
         "key": api_key,
         "types": "geocode",  # Restrict to addresses
     }
     
+    resp = get_places_session().get(endpoint, params=params, timeout=3)
+    resp.raise_for_status()
+    
+    data = orjson.loads(resp.content)
+    status = data.get("status")
+    
+    # Handle different API response statuses
+    if status == "OK":
+        predictions = data.get("predictions", [])
+        return [pred["description"] for pred in predictions[:5]]  # Return top 5
+    elif status == "ZERO_RESULTS":
+        return []
+    else:
+        # Common issues: "REQUEST_DENIED" (API not enabled), "INVALID_REQUEST", etc.
+        raise RuntimeError(f"Places autocomplete failed with status {status}")
+
+
+def get_places_autocomplete(api_key: str, input_text: str):
+    """
+    Get autocomplete suggestions from Google Places API.
+    Results are cached per (api_key, normalized query).
+    Returns a list of place descriptions, or empty list on failure.
+    """
+    query = (input_text or "").strip().lower()
+    if len(query) < 2:
+        return []
+    
     try:
-        resp = requests.get(endpoint, params=params, timeout=3)
-        if resp.status_code != 200:
-            return []
-        
-        data = resp.json()
-        status = data.get("status")
-        
-        # Handle different API response statuses
-        if status == "OK":
-            predictions = data.get("predictions", [])
-            return [pred["description"] for pred in predictions[:5]]  # Return top 5
-        elif status == "ZERO_RESULTS":
-            return []
-        else:
-            # Log error status for debugging (but don't show to user)
-            # Common issues: "REQUEST_DENIED" (API not enabled), "INVALID_REQUEST", etc.
-            return []
-    except Exception as e:
+        return _fetch_places_predictions(api_key, query)
+    except Exception:
         # Silently fail - don't show errors to user
         return []
 
 
+def set_address_input(key: str, value: str):
+    """
+    Set the value of an address_input_with_autocomplete field and clear its
+    suggestions. Used as a widget callback so it runs before the input is drawn.
+    """
+    st.session_state[f"{key}_input"] = value
+    st.session_state[f"{key}_text_input"] = value
+    st.session_state[f"{key}_last_query"] = ""
+    st.session_state[f"{key}_suggestions"] = []
+
+
+def swap_origin_destination():
+    """Swap button callback: exchange the origin and destination inputs."""
+    # Read the widget keys: callbacks run before the script, so *_input still
+    # holds the previous run's values and would drop an edit made with the click
+    origin_val = st.session_state.get("origin_text_input", "")
+    dest_val = st.session_state.get("destination_text_input", "")
+    set_address_input("origin", dest_val)
+    set_address_input("destination", origin_val)
+
+
 def address_input_with_autocomplete(label: str, key: str, default_value: str, api_key: str):
     """
     Create a text input with autocomplete suggestions.
@@ -99,32 +244,35 @@ def address_input_with_autocomplete(label: str, key: str, default_value: str, ap
         st.session_state[f"{key}_last_query"] = ""
     if f"{key}_suggestions" not in st.session_state:
         st.session_state[f"{key}_suggestions"] = []
-    if f"{key}_widget_version" not in st.session_state:
-        st.session_state[f"{key}_widget_version"] = 0
     
-    # Text input - use a versioned key to force reset when suggestion is selected
-    widget_version = st.session_state[f"{key}_widget_version"]
-    input_key = f"{key}_text_input_v{widget_version}"
+    # The text input's value lives in session state under its widget key, so
+    # callbacks can overwrite it before the widget is drawn (no st.rerun needed)
+    input_key = f"{key}_text_input"
+    if input_key not in st.session_state:
+        st.session_state[input_key] = st.session_state[f"{key}_input"]
     
     # Get the current input value
     previous_input = st.session_state.get(f"{key}_input", default_value)
     
-    current_input = st.sidebar.text_input(
-        label,
-        value=previous_input,
-        key=input_key
-    )
+    current_input = st.sidebar.text_input(label, key=input_key)
     
-    # Check if input has changed (compare with previous value)
+    # Check if input has changed (compare with the value from the last rerun)
     input_changed = current_input != previous_input
+    last_query = st.session_state[f"{key}_last_query"]
     
-    # Update session state
-    st.session_state[f"{key}_input"] = current_input
-    
-    # Get suggestions if input has changed and is long enough
-    if input_changed and len(current_input) >= 2:
-        # Fetch new suggestions
-        suggestions = get_places_autocomplete(api_key, current_input)
+    # Get suggestions only if the input changed to something not yet queried
+    if input_changed and len(current_input) >= 2 and current_input != last_query:
+        narrowed = [
+            suggestion for suggestion in st.session_state[f"{key}_suggestions"]
+            if suggestion.lower().startswith(current_input.lower())
+        ]
+        if last_query and current_input.lower().startswith(last_query.lower()) and narrowed:
+            # Input only extends the last query and earlier suggestions still
+            # match it, so reuse them instead of calling the API again
+            suggestions = narrowed
+        else:
+            # Fetch new suggestions
+            suggestions = get_places_autocomplete(api_key, current_input)
         st.session_state[f"{key}_last_query"] = current_input
         st.session_state[f"{key}_suggestions"] = suggestions
     elif len(current_input) < 2:
@@ -133,7 +281,7 @@ def address_input_with_autocomplete(label: str, key: str, default_value: str, ap
         st.session_state[f"{key}_last_query"] = ""
         suggestions = []
     else:
-        # If input hasn't changed, use cached suggestions
+        # No-op: input unchanged (or already queried), use cached suggestions
         suggestions = st.session_state.get(f"{key}_suggestions", [])
     
     # Show suggestions if available
@@ -143,58 +291,172 @@ def address_input_with_autocomplete(label: str, key: str, default_value: str, ap
         if current_input == st.session_state[f"{key}_last_query"]:
             st.sidebar.caption("💡 Suggestions:")
             for i, suggestion in enumerate(suggestions):
-                if st.sidebar.button(suggestion, key=f"{key}_suggestion_{i}", use_container_width=True):
-                    # Update the input value and increment widget version to force reset
-                    st.session_state[f"{key}_input"] = suggestion
-                    st.session_state[f"{key}_last_query"] = suggestion
-                    st.session_state[f"{key}_suggestions"] = []
-                    st.session_state[f"{key}_widget_version"] += 1
-                    st.rerun()
+                st.sidebar.button(
+                    suggestion,
+                    key=f"{key}_suggestion_{i}",
+                    use_container_width=True,
+                    on_click=set_address_input,
+                    args=(key, suggestion),
+                )
     
-    return st.session_state[f"{key}_input"]
+    # Remember this value for the next rerun's change check
+    st.session_state[f"{key}_input"] = current_input
+    return current_input
 
 
-def call_distance_matrix(
-    api_key: str,
-    origin: str,
-    destination: str,
-    departure_dt,
-    mode: str = "driving",
-    traffic_model: str = "best_guess"
+def _element_seconds(element: dict):
+    """
+    Extract the travel time in seconds from a single Distance Matrix element.
+    Returns None if the element has no usable result.
+    """
+    if element.get("status") != "OK":
+        return None
+    # Prefer duration_in_traffic if available
+    if "duration_in_traffic" in element:
+        return element["duration_in_traffic"]["value"]  # seconds
+    else:
+        return element["duration"]["value"]  # seconds
+
+
+class RequestPacer:
+    """
+    Space out request start times across worker threads by at least
+    min_interval seconds. Requests may still overlap while in flight.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        """Block until the caller may start its next request."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def _fetch_distance_matrix(
+    _api_key: str,
+    origins: tuple,
+    destinations: tuple,
+    departure_epoch: int,
+    mode: str,
+    traffic_model: str,
+    _pacer=None,
 ):
     """
-    Call Google Distance Matrix API for a single origin/destination/time.
-    Returns travel time in seconds, or None on failure.
+    Fetch the raw travel-time matrix (seconds) for one departure time.
+    The API key and pacer are excluded from the cache key (leading underscore).
+    HTTP errors and any non-OK API status raise so that they are never cached.
+    Only actual HTTP requests wait on the pacer; cache hits return immediately.
     """
     endpoint = "https://maps.googleapis.com/maps/api/distancematrix/json"
 
     params = {
-        "origins": origin,
-        "destinations": destination,
+        "origins": "|".join(origins),
+        "destinations": "|".join(destinations),
         "mode": mode,
-        "departure_time": int(departure_dt.timestamp()),  # seconds since epoch
+        "departure_time": departure_epoch,  # seconds since epoch
         "traffic_model": traffic_model,
-        "key": api_key,
+        "key": _api_key,
     }
 
-    resp = requests.get(endpoint, params=params)
-    if resp.status_code != 200:
-        return None
+    if _pacer is not None:
+        # Be nice to the API
+        _pacer.wait()
+    resp = get_http_session().get(endpoint, params=params, timeout=10)
+    resp.raise_for_status()
 
-    data = resp.json()
-    # Basic sanity checks
-    try:
-        row = data["rows"][0]
-        element = row["elements"][0]
-        if element.get("status") != "OK":
-            return None
-        # Prefer duration_in_traffic if available
-        if "duration_in_traffic" in element:
-            return element["duration_in_traffic"]["value"]  # seconds
-        else:
-            return element["duration"]["value"]  # seconds
-    except (KeyError, IndexError):
-        return None
+    data = orjson.loads(resp.content)
+    status = data.get("status")
+    if status != "OK":
+        # e.g. "OVER_QUERY_LIMIT", "REQUEST_DENIED": sent with HTTP 200 and no rows
+        raise RuntimeError(f"Distance Matrix request failed with status {status}")
+
+    matrix = [[None] * len(destinations) for _ in origins]
+    for i, row in enumerate(data["rows"][:len(origins)]):
+        for j, element in enumerate(row["elements"][:len(destinations)]):
+            matrix[i][j] = _element_seconds(element)
+    return matrix
+
+
+def call_distance_matrix_batch(
+    api_key: str,
+    origins: list,
+    destinations: list,
+    departure_time: int,
+    mode: str = "driving",
+    traffic_model: str = "best_guess",
+    pacer=None,
+):
+    """
+    Call Google Distance Matrix API for several origins/destinations that share
+    the same departure time (epoch seconds), sent as pipe-separated lists.
+    Large lists are split into as few requests as the origin, destination and
+    element limits allow. If a RequestPacer is given, each HTTP request (not
+    a cache hit) waits on it.
+    Returns a matrix (one row per origin, one column per destination) of travel
+    times in seconds, with None for any element that failed.
+    """
+    # Quantize the departure time so equivalent requests share a cache entry
+    departure_epoch = int(departure_time)
+    departure_epoch -= departure_epoch % DEPARTURE_BUCKET_SECONDS
+
+    matrix = [[None] * len(destinations) for _ in origins]
+    if not origins or not destinations:
+        return matrix
+
+    # Split into sub-requests that respect the per-request API limits
+    dest_step = min(len(destinations), MAX_DESTINATIONS_PER_REQUEST)
+    origin_step = min(MAX_ORIGINS_PER_REQUEST, MAX_ELEMENTS_PER_REQUEST // dest_step)
+    for i0 in range(0, len(origins), origin_step):
+        for j0 in range(0, len(destinations), dest_step):
+            try:
+                block = _fetch_distance_matrix(
+                    api_key,
+                    tuple(origins[i0:i0 + origin_step]),
+                    tuple(destinations[j0:j0 + dest_step]),
+                    departure_epoch,
+                    mode,
+                    traffic_model,
+                    pacer,
+                )
+            except (requests.RequestException, RuntimeError, ValueError, KeyError, IndexError, TypeError):
+                continue
+            for i, row in enumerate(block):
+                matrix[i0 + i][j0:j0 + len(row)] = row
+    return matrix
+
+
+def call_distance_matrix(
+    api_key: str,
+    origin: str,
+    destination: str,
+    departure_dt,
+    mode: str = "driving",
+    traffic_model: str = "best_guess",
+    pacer=None,
+):
+    """
+    Call Google Distance Matrix API for a single origin/destination/time.
+    If a RequestPacer is given, any HTTP request waits on it.
+    Returns travel time in seconds, or None on failure.
+    """
+    matrix = call_distance_matrix_batch(
+        api_key=api_key,
+        origins=[origin],
+        destinations=[destination],
+        departure_time=int(departure_dt.timestamp()),
+        mode=mode,
+        traffic_model=traffic_model,
+        pacer=pacer,
+    )
+    return matrix[0][0]
 
 
 def build_traffic_matrix(
@@ -208,72 +470,121 @@ def build_traffic_matrix(
     traffic_model: str,
     pause_seconds: float,
     progress_bar=None,
-    status_text=None
+    status_text=None,
+    max_workers: int = MAX_CONCURRENT_REQUESTS,
 ):
     """
     Build a DataFrame indexed by day (rows) and time-of-day (columns),
     with values = travel time in minutes.
     """
-    tzinfo = tz.gettz(tz_name)
-    records = []
-    
-    total_calls = len(selected_days) * len(time_slots)
-    completed_calls = 0
+    tzinfo = get_tzinfo(tz_name)
+    week_start = get_week_anchor(tzinfo).date()
+    time_slot_labels = [label for label, _ in time_slots]
+    # Rows = selected days, columns = time slots; cells without data stay NaN
+    travel_minutes = np.full((len(selected_days), len(time_slots)), np.nan, dtype=np.float32)
+
+    # The API takes a single departure_time per request, so group the grid
+    # cells by departure time and issue one request per unique departure.
+    departure_epochs = get_departure_epochs(
+        week_start,
+        [DAY_TO_INDEX[day] for day in selected_days],
+        [hour * 60 + minute for _, (hour, minute) in time_slots],
+        tzinfo,
+    )
+    cells_by_departure = {}
+    for (row, col), departure_time in np.ndenumerate(departure_epochs):
+        cells_by_departure.setdefault(int(departure_time), []).append((row, col))
 
-    for day in selected_days:
-        day_idx = DAYS_ORDER.index(day)
-        for label, (hour, minute) in time_slots:
-            dt_future = get_next_datetime_for_weekday(day_idx, hour, minute, tzinfo)
-            travel_seconds = call_distance_matrix(
-                api_key=api_key,
-                origin=origin,
-                destination=destination,
-                departure_dt=dt_future,
-                mode=mode,
-                traffic_model=traffic_model,
-            )
-            # Be nice to the API
-            time.sleep(pause_seconds)
+    total_calls = len(cells_by_departure)
+    completed_calls = 0
+    # Throttle widget updates: each one is a websocket round trip to the browser
+    progress_every = max(1, total_calls // PROGRESS_UPDATE_STEPS)
+    last_progress_update = 0.0
+
+    # Requests are independent and network-bound, so run them concurrently and
+    # collect results (and progress) on the script thread as they complete.
+    # pause_seconds spaces out request starts across all workers.
+    pacer = RequestPacer(pause_seconds)
+    with ThreadPoolExecutor(max_workers=min(max(1, max_workers), HTTP_POOL_MAXSIZE)) as executor:
+        futures = {
+            executor.submit(
+                call_distance_matrix,
+                api_key,
+                origin,
+                destination,
+                datetime.fromtimestamp(departure_time, tzinfo),
+                mode,
+                traffic_model,
+                pacer,
+            ): cells
+            for departure_time, cells in cells_by_departure.items()
+        }
+
+        for future in as_completed(futures):
+            cells = futures[future]
+            travel_seconds = future.result()
 
             if travel_seconds is not None:
-                travel_minutes = travel_seconds / 60.0
-            else:
-                travel_minutes = None
-
-            records.append(
-                {
-                    "day": day,
-                    "time_slot": label,
-                    "travel_minutes": travel_minutes,
-                }
-            )
-            
+                for row, col in cells:
+                    travel_minutes[row, col] = travel_seconds / 60.0
+
             # Update progress
             completed_calls += 1
+            now = time.monotonic()
+            if not (
+                completed_calls % progress_every == 0
+                or completed_calls == total_calls
+                or now - last_progress_update > PROGRESS_UPDATE_INTERVAL_SECONDS
+            ):
+                continue
+            last_progress_update = now
             if progress_bar is not None:
                 progress = completed_calls / total_calls
                 progress_bar.progress(progress)
             if status_text is not None:
+                row, col = cells[0]
+                day, label = selected_days[row], time_slot_labels[col]
                 status_text.text(f"Completed {completed_calls} of {total_calls} API calls ({day} {label})")
 
-    df = pd.DataFrame(records)
-    if df.empty:
-        return df
-
-    # Pivot: rows = day, columns = time_slot
-    heat_df = df.pivot(index="day", columns="time_slot", values="travel_minutes")
-    
-    # Reorder columns chronologically (time_slots are already in chronological order)
-    time_slot_labels = [label for label, _ in time_slots]
-    # Only include columns that exist in the DataFrame
-    existing_columns = [col for col in time_slot_labels if col in heat_df.columns]
-    heat_df = heat_df[existing_columns]
-    
-    # Sort rows by DAYS_ORDER
-    heat_df = heat_df.reindex(DAYS_ORDER).loc[selected_days]
+    heat_df = pd.DataFrame(
+        travel_minutes,
+        index=pd.Index(selected_days, name="day"),
+        columns=pd.Index(time_slot_labels, name="time_slot"),
+    )
     return heat_df
 
 
+@st.cache_resource(max_entries=8)
+def build_heatmap_figure(heat_df: pd.DataFrame) -> go.Figure:
+    """
+    Build the Plotly heatmap for a travel-time DataFrame.
+    Cached on the DataFrame contents so reruns reuse the same figure.
+    """
+    # Precompute the cell labels once instead of using text_auto
+    z = heat_df.to_numpy()
+    cell_text = np.where(np.isnan(z), "", np.char.mod("%.1f", z))
+
+    fig = go.Figure(
+        go.Heatmap(
+            z=z,
+            x=heat_df.columns,
+            y=heat_df.index,
+            text=cell_text,
+            texttemplate="%{text}",
+            colorscale="Turbo",
+            colorbar=dict(title="Travel time (min)"),
+            hovertemplate="%{y} %{x}<br>%{text} min<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        height=600,
+        xaxis_title="Time of day",
+        yaxis_title="Day of week",
+        yaxis_autorange="reversed",
+    )
+    return fig
+
+
 # ---------------------------------------------------------
 # Streamlit UI
 # ---------------------------------------------------------
@@ -314,29 +625,7 @@ origin = address_input_with_autocomplete("Origin", "origin", "San Francisco, CA"
 destination = address_input_with_autocomplete("Destination", "destination", "San Jose, CA", api_key)
 
 # Button to swap origin and destination
-if st.sidebar.button("Swap origin/destination"):
-    # Use the session_state keys used by address_input_with_autocomplete
-    origin_val = st.session_state.get("origin_input", origin)
-    dest_val = st.session_state.get("destination_input", destination)
-
-    # Swap the input values
-    st.session_state["origin_input"], st.session_state["destination_input"] = (
-        dest_val,
-        origin_val,
-    )
-    
-    # Increment widget versions to force widgets to reset with new values
-    st.session_state["origin_widget_version"] = st.session_state.get("origin_widget_version", 0) + 1
-    st.session_state["destination_widget_version"] = st.session_state.get("destination_widget_version", 0) + 1
-    
-    # Clear suggestions and last queries for both fields
-    st.session_state["origin_suggestions"] = []
-    st.session_state["origin_last_query"] = ""
-    st.session_state["destination_suggestions"] = []
-    st.session_state["destination_last_query"] = ""
-
-    # Re-run so the inputs update visually
-    st.rerun()
+st.sidebar.button("Swap origin/destination", on_click=swap_origin_destination)
 
 mode = st.sidebar.selectbox("Travel mode", ["driving", "transit", "bicycling", "walking"])
 traffic_model = st.sidebar.selectbox(
@@ -354,23 +643,20 @@ selected_days = st.sidebar.multiselect(
     default=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
 )
 
-# Create hour options with 12-hour format labels
-hour_options = list(range(24))
-hour_labels = [format_hour_12h(h) for h in hour_options]
-
+# Hour pickers use 12-hour format labels
 start_hour_label = st.sidebar.select_slider(
     "Start hour",
-    options=hour_labels,
-    value=hour_labels[7]  # Default to 7 AM
+    options=HOUR_LABELS,
+    value=HOUR_LABELS[7]  # Default to 7 AM
 )
-start_hour = hour_options[hour_labels.index(start_hour_label)]
+start_hour = HOUR_FROM_LABEL[start_hour_label]
 
 end_hour_label = st.sidebar.select_slider(
     "End hour",
-    options=hour_labels,
-    value=hour_labels[19]  # Default to 7 PM
+    options=HOUR_LABELS,
+    value=HOUR_LABELS[19]  # Default to 7 PM
 )
-end_hour = hour_options[hour_labels.index(end_hour_label)]
+end_hour = HOUR_FROM_LABEL[end_hour_label]
 step_minutes = st.sidebar.selectbox("Time step (minutes)", [15, 30, 60], index=2)
 
 # Minimal input validation
@@ -380,6 +666,9 @@ if end_hour <= start_hour:
 
 # Timezone (for departure_time)
 tz_name = st.sidebar.text_input("Timezone (IANA name)", value="America/Los_Angeles")
+if get_tzinfo(tz_name) is None:
+    st.sidebar.error(f"Unknown timezone: {tz_name}")
+    st.stop()
 
 pause_seconds = st.sidebar.slider(
     "Pause between API calls (seconds)",
@@ -389,35 +678,21 @@ pause_seconds = st.sidebar.slider(
     step=0.05,
 )
 
+max_workers = st.sidebar.slider(
+    "Concurrent API requests",
+    min_value=1,
+    max_value=HTTP_POOL_MAXSIZE,
+    value=MAX_CONCURRENT_REQUESTS,
+    help="Number of Distance Matrix requests sent in parallel",
+)
+
 st.sidebar.info(
     "⚠️ Each cell in the heatmap = one API call. A 5-day × 13-hour (1h step) grid "
     "is 65 calls. Keep quotas in mind."
 )
 
 # Build time slots
-time_slots = []
-current_minutes = start_hour * 60
-end_minutes = end_hour * 60
-
-while current_minutes <= end_minutes:
-    hour = current_minutes // 60
-    minute = current_minutes % 60
-    # Convert to 12-hour format with AM/PM
-    if hour == 0:
-        display_hour = 12
-        period = "AM"
-    elif hour < 12:
-        display_hour = hour
-        period = "AM"
-    elif hour == 12:
-        display_hour = 12
-        period = "PM"
-    else:
-        display_hour = hour - 12
-        period = "PM"
-    label = f"{display_hour}:{minute:02d} {period}"
-    time_slots.append((label, (hour, minute)))
-    current_minutes += step_minutes
+time_slots = build_time_slots(start_hour, end_hour, step_minutes)
 
 st.write("### Configuration summary")
 st.write(f"- **Origin:** {origin}")
@@ -433,6 +708,18 @@ if not selected_days:
 
 run_btn = st.button("Build traffic heatmap")
 
+# Everything that determines the heatmap; a stored result is only shown
+# again while these are unchanged
+heatmap_inputs = (
+    origin,
+    destination,
+    tz_name,
+    tuple(selected_days),
+    tuple(time_slots),
+    mode,
+    traffic_model,
+)
+
 if run_btn:
     total_calls = len(selected_days) * len(time_slots)
     st.write(f"**Querying {total_calls} time slots...**")
@@ -440,7 +727,7 @@ if run_btn:
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    heat_df = build_traffic_matrix(
+    st.session_state["heat_df"] = build_traffic_matrix(
         api_key=api_key,
         origin=origin,
         destination=destination,
@@ -452,26 +739,31 @@ if run_btn:
         pause_seconds=pause_seconds,
         progress_bar=progress_bar,
         status_text=status_text,
+        max_workers=max_workers,
     )
+    st.session_state["heatmap_inputs"] = heatmap_inputs
     
     progress_bar.empty()
     status_text.empty()
 
-    if heat_df.empty:
+# Keep showing the last heatmap across reruns triggered by unrelated widgets
+if st.session_state.get("heatmap_inputs") == heatmap_inputs:
+    heat_df = st.session_state["heat_df"]
+
+    if heat_df.isna().all(axis=None):
         st.error("No data returned from Distance Matrix API. Check inputs or quotas.")
     else:
         st.subheader("Travel time heatmap (minutes)")
-        st.dataframe(heat_df.style.format("{:.1f}"))
-
-        fig = px.imshow(
+        # Format on the client via column_config instead of shipping a Styler
+        st.dataframe(
             heat_df,
-            labels=dict(x="Time of day", y="Day of week", color="Travel time (min)"),
-            aspect="auto",
-            origin="upper",
-            text_auto=".1f",
-            color_continuous_scale="Turbo",
+            column_config={
+                col: st.column_config.NumberColumn(format="%.1f")
+                for col in heat_df.columns
+            },
         )
-        fig.update_layout(height=600)
+
+        fig = build_heatmap_figure(heat_df)
         st.plotly_chart(fig, use_container_width=True)
 
         st.caption(